@@ -1,51 +1,290 @@
 # api/function_app.py
 import logging
 import os
-import json
 import base64
+import functools
+import threading
+import time
 import requests # Used for making HTTP requests
 import ipaddress # For IP address validation
+import orjson # Fast JSON parsing/serialization for API payloads
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import azure.functions as func # type: ignore
 
 # Initialize the Function App instance
 app = func.FunctionApp()
 
-# Define your HTTP trigger function using a decorator
-@app.route(route="GetBeyondTrustData", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
-def GetBeyondTrustData(req: func.HttpRequest) -> func.HttpResponse:
-    logging.info('Python HTTP trigger function processed a request.')
+# Number of pages requested in parallel when walking a paginated endpoint
+PAGE_FETCH_WORKERS = 8
+
+# Upper bound on concurrent API requests across all invocations in this worker
+MAX_CONCURRENT_REQUESTS = 32
+
+# Shared HTTP session so parallel page fetches reuse pooled connections.
+# Transient throttling and server errors are retried with exponential backoff;
+# once retries are exhausted the last response is returned so raise_for_status()
+# still surfaces it as an HTTPError.
+_retry = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(["GET", "POST"]),
+    raise_on_status=False
+)
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_CONCURRENT_REQUESTS, max_retries=_retry)
+_session = requests.Session()
+_session.mount("https://", _adapter)
+_session.mount("http://", _adapter)
+_session.headers["Accept"] = "application/json"
+_session.headers["Accept-Encoding"] = "gzip, deflate" # requests decompresses these transparently
+
+# The token request is made while holding _token_lock, so it gets its own session
+# whose retries ignore Retry-After: a throttled token endpoint must not block
+# every concurrent invocation for as long as the server asks.
+_token_adapter = HTTPAdapter(max_retries=_retry.new(respect_retry_after_header=False))
+_token_session = requests.Session()
+_token_session.mount("https://", _token_adapter)
+_token_session.mount("http://", _token_adapter)
+_token_session.headers["Accept"] = "application/json"
+
+# Long-lived pool shared by every invocation for individual API requests.
+# Only leaf requests are submitted here (nothing running on it waits on other
+# tasks), so concurrent invocations cannot deadlock the pool.
+_io_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="beyondtrust-io")
+
+# Jump Groups change rarely, so they are cached in-process for this many seconds
+DEFAULT_JUMP_GROUP_CACHE_TTL = 300
+
+
+def _read_cache_ttl():
+    """Read BT_CACHE_TTL, falling back to the default on a missing or invalid value."""
+    raw_ttl = os.environ.get('BT_CACHE_TTL')
+    if raw_ttl is None:
+        return DEFAULT_JUMP_GROUP_CACHE_TTL
+    try:
+        return int(raw_ttl)
+    except ValueError:
+        logging.warning(f"Invalid BT_CACHE_TTL value '{raw_ttl}', using {DEFAULT_JUMP_GROUP_CACHE_TTL} seconds.")
+        return DEFAULT_JUMP_GROUP_CACHE_TTL
+
+
+JUMP_GROUP_CACHE_TTL = _read_cache_ttl()
+
+# Jump Group API URL -> (fetched_at, {group ID: group name})
+_jump_group_cache = {}
+
+# Ask the installer endpoint to return only the fields this app reads. Opt-in,
+# since the API may not support sparse fieldsets (unknown parameters are ignored).
+INSTALLER_FIELDS = "installer_id,name,jump_group_id,expiration_timestamp"
+SPARSE_INSTALLER_FIELDS = os.environ.get('BT_SPARSE_FIELDS') == '1'
+
+
+class _AuthenticationError(Exception):
+    """Raised when the token endpoint responds without an access token."""
+
+
+# Access tokens are reused across invocations until shortly before they expire.
+# (site URL, API key) -> (expires_at, "<token_type> <access_token>")
+TOKEN_EXPIRY_MARGIN = 60
+_token_cache = {}
+_token_lock = threading.Lock()
+
+
+def _iter_pages(api_url, headers, item_label, per_page=100, extra_query=""):
+    """Yield each page of items from a paginated BeyondTrust list endpoint.
+
+    The first page is requested on its own; if it is full, the following pages
+    are requested by page number, PAGE_FETCH_WORKERS at a time in parallel. If
+    the last page of that first parallel batch advertises a cursor via a Link
+    rel="next" header, the remaining (deep) pages follow that cursor instead,
+    so they do not pay the server-side cost of large offsets. Fetching stops at
+    the first empty or short page, and pages are yielded in order.
+    extra_query (e.g. "&fields=...") is appended to every page-number URL, and
+    to cursor URLs that do not already carry it.
+    """
+    def fetch_page(page_url, page):
+        logging.debug(f"Fetching {item_label} page {page}: {page_url}")
+        page_response = _session.get(page_url, headers=headers)
+        page_response.raise_for_status()
+        if page == 1:
+            logging.debug(f"{item_label} first page: {len(page_response.content)} bytes, Content-Encoding: {page_response.headers.get('Content-Encoding')}")
+
+        # Only a next link that is not just another page number is worth following
+        next_url = page_response.links.get('next', {}).get('url')
+        if next_url and 'current_page=' not in next_url:
+            next_url = urljoin(page_response.url, next_url)
+            # Keep extra query parameters the server did not carry into its cursor link
+            if extra_query and extra_query.lstrip('&') not in next_url:
+                next_url += extra_query if '?' in next_url else '?' + extra_query.lstrip('&')
+        else:
+            next_url = None
+        return orjson.loads(page_response.content), next_url
+
+    def numbered_page_url(page):
+        return f"{api_url}?per_page={per_page}&current_page={page}{extra_query}"
+
+    total_retrieved = 0
+    pages_retrieved = 0
+    next_page = 1 # API uses 1-based indexing for pages
+    cursor_url = None
+    end_of_data = False
+
+    while not end_of_data:
+        if cursor_url:
+            # Cursor pages are sequential: each response names the next one
+            batch = [fetch_page(cursor_url, next_page)]
+        elif next_page == 1:
+            # Most tenants fit on one page, so only fan out once the first page is full
+            batch = [fetch_page(numbered_page_url(1), 1)]
+        else:
+            futures = [
+                _io_executor.submit(fetch_page, numbered_page_url(page), page)
+                for page in range(next_page, next_page + PAGE_FETCH_WORKERS)
+            ]
+            try:
+                # Collect in page order so the output keeps the API ordering
+                batch = [future.result() for future in futures]
+            finally:
+                # Stop queued sibling pages once any of them has failed; no-op on success
+                for future in futures:
+                    future.cancel()
+
+        for page_items, cursor_url in batch:
+            if not isinstance(page_items, list):
+                logging.error(f"Expected a list of {item_label} but got {type(page_items)}. Stopping.")
+                end_of_data = True
+                break
 
-    # Retrieve BeyondTrust credentials from environment variables
-    beyond_trust_site_url = os.environ.get('BeyondTrustSiteUrl')
-    api_key = os.environ.get('BeyondTrustApiKey')
-    api_secret = os.environ.get('BeyondTrustApiSecret')
+            if not page_items: # No more items on this page
+                logging.debug(f"No more {item_label} found on this page. End of data.")
+                end_of_data = True
+                break
 
-    # --- Basic Variable Check ---
-    if not beyond_trust_site_url or not api_key or not api_secret:
-        error_msg = "Error: BeyondTrust credentials environment variables are not set."
-        logging.error(error_msg)
-        return func.HttpResponse(
-            json.dumps({"error": error_msg}),
-            mimetype="application/json",
-            status_code=500
-        )
+            total_retrieved += len(page_items)
+            pages_retrieved += 1
+            logging.debug(f"Retrieved {len(page_items)} {item_label} from this page. Total retrieved so far: {total_retrieved}.")
+            yield page_items
+
+            if len(page_items) < per_page: # Last page reached
+                logging.debug(f"Last page of {item_label} reached.")
+                end_of_data = True
+                break
+
+        if next_page == 1:
+            # Cursors are only followed for deep pages, after the first parallel batch
+            cursor_url = None
+        next_page += len(batch) # Prepare for the next batch of pages
+
+    # The calling handler logs the INFO summary for the listing
+    logging.debug(f"Retrieved {total_retrieved} {item_label} across {pages_retrieved} pages.")
+
+
+def _fetch_all_pages(api_url, headers, item_label, per_page=100):
+    """Retrieve every item from a paginated BeyondTrust list endpoint as one list."""
+    all_items = []
+    for page_items in _iter_pages(api_url, headers, item_label, per_page):
+        all_items.extend(page_items)
+    return all_items
 
+
+@functools.lru_cache(maxsize=4096)
+def _expiration_sort_key(timestamp):
+    """Return a numeric sort key for an installer expiration timestamp.
+
+    Accepts ISO-8601 strings or Unix epoch values. Missing or unparseable
+    timestamps sort before every real one. Cached since many installers share
+    the same timestamp.
+    """
+    if timestamp is None or timestamp == '':
+        return float('-inf')
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
     try:
-        # --- Authentication Step ---
-        auth_url = f"{beyond_trust_site_url}/oauth2/token"
+        expiration = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            return float(timestamp)
+        except ValueError:
+            logging.debug(f"Unrecognized expiration timestamp '{timestamp}', treating as oldest.")
+            return float('-inf')
+    if expiration.tzinfo is None:
+        expiration = expiration.replace(tzinfo=timezone.utc)
+    return expiration.timestamp()
+
+
+def _fetch_latest_installers(api_url, headers, per_page=100):
+    """Retrieve the installer with the latest expiration date for each Jump Group.
+
+    Each page is folded into the result as it arrives, so only one installer per
+    group is held in memory rather than the full installer list.
+    Returns a mapping of Jump Group ID to installer.
+    """
+    extra_query = f"&fields={INSTALLER_FIELDS}" if SPARSE_INSTALLER_FIELDS else ""
+    latest_by_group = {}
+    for page_items in _iter_pages(api_url, headers, "installers", per_page, extra_query):
+        for installer in page_items:
+            group_id = installer.get('jump_group_id')
+            expiration = _expiration_sort_key(installer.get('expiration_timestamp'))
+            current = latest_by_group.get(group_id)
+            if current is None or expiration > current[0]:
+                latest_by_group[group_id] = (expiration, installer)
+
+    return {group_id: installer for group_id, (_, installer) in latest_by_group.items()}
+
+
+def _fetch_jump_group_map(api_url, headers):
+    """Retrieve all Jump Groups and return a mapping of group ID to group name.
+
+    Results are cached per URL for JUMP_GROUP_CACHE_TTL seconds.
+    """
+    cached = _jump_group_cache.get(api_url)
+    if cached and time.monotonic() - cached[0] < JUMP_GROUP_CACHE_TTL:
+        logging.debug("Jump Group cache hit.")
+        return cached[1]
+    logging.debug("Jump Group cache miss.")
+
+    logging.info(f"Attempting to retrieve all Jump Groups from: {api_url}")
+    jump_groups_response = _session.get(api_url, headers=headers)
+    jump_groups_response.raise_for_status()
+    all_jump_groups = orjson.loads(jump_groups_response.content)
+    logging.info(f"Successfully retrieved {len(all_jump_groups)} Jump Groups.")
+
+    jump_group_map = {group['id']: group['name'] for group in all_jump_groups}
+    _jump_group_cache[api_url] = (time.monotonic(), jump_group_map)
+    return jump_group_map
+
+
+def _get_authorization(site_url, api_key, api_secret):
+    """Return the Authorization header value for BeyondTrust API requests.
+
+    A cached access token is reused while it is valid; otherwise a new one is
+    requested with the client credentials grant. The lock ensures concurrent
+    invocations share a single token request.
+    """
+    cache_key = (site_url, api_key)
+    with _token_lock:
+        cached = _token_cache.get(cache_key)
+        if cached and time.monotonic() < cached[0]:
+            logging.info("Reusing cached access token.")
+            return cached[1]
+
+        auth_url = f"{site_url}/oauth2/token"
         auth_string = f"{api_key}:{api_secret}"
         base64_auth_string = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
 
         auth_headers = {
             "Authorization": f"Basic {base64_auth_string}",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Accept": "application/json"
+            "Content-Type": "application/x-www-form-urlencoded"
         }
         auth_body = {"grant_type": "client_credentials"}
 
         logging.info(f"Attempting to obtain access token from: {auth_url}")
-        auth_response = requests.post(auth_url, headers=auth_headers, data=auth_body)
+        auth_response = _token_session.post(auth_url, headers=auth_headers, data=auth_body)
         auth_response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
         auth_token_response = auth_response.json()
 
@@ -53,112 +292,115 @@ def GetBeyondTrustData(req: func.HttpRequest) -> func.HttpResponse:
         token_type = auth_token_response.get('token_type')
 
         if not access_token:
-            error_details = auth_token_response.get('error_description', auth_token_response.get('error', 'Unknown authentication error.'))
-            logging.error(f"Failed to obtain access token. Details: {error_details}")
-            return func.HttpResponse(
-                json.dumps({"error": "Failed to obtain access token.", "details": error_details}),
-                mimetype="application/json",
-                status_code=401
-            )
+            raise _AuthenticationError(auth_token_response.get('error_description', auth_token_response.get('error', 'Unknown authentication error.')))
         logging.info("Successfully obtained access token.")
 
-        # --- Fetch All Jump Groups ---
-        jump_group_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-group"
-        jump_group_headers = {
-            "Authorization": f"{token_type} {access_token}",
-            "Accept": "application/json"
-        }
-        logging.info(f"Attempting to retrieve all Jump Groups from: {jump_group_api_url}")
-        jump_groups_response = requests.get(jump_group_api_url, headers=jump_group_headers)
-        jump_groups_response.raise_for_status()
-        all_jump_groups = jump_groups_response.json()
-        logging.info(f"Successfully retrieved {len(all_jump_groups)} Jump Groups.")
+        authorization = f"{token_type} {access_token}"
+        expires_in = int(auth_token_response.get('expires_in') or 0)
+        _token_cache[cache_key] = (time.monotonic() + expires_in - TOKEN_EXPIRY_MARGIN, authorization)
+        return authorization
 
-        jump_group_map = {group['id']: group['name'] for group in all_jump_groups}
 
-        # --- Fetch All Jump Client Installers ---
-        base_installers_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-client/installer"
-        installer_list_headers = {
-            "Authorization": f"{token_type} {access_token}",
-            "Accept": "application/json"
-        }
-        
-        all_installers_data = []
-        current_page = 1 # API uses 1-based indexing for pages
-        per_page = 100  # Equivalent to limit
+def _invalidate_authorization(site_url, api_key, authorization):
+    """Drop the cached access token if it is still the one the API rejected."""
+    with _token_lock:
+        cached = _token_cache.get((site_url, api_key))
+        if cached and cached[1] == authorization:
+            del _token_cache[(site_url, api_key)]
 
-        logging.info(f"Attempting to retrieve ALL Jump Client Installers from: {base_installers_api_url} with pagination (per_page={per_page}).")
 
-        while True:
-            paginated_url = f"{base_installers_api_url}?per_page={per_page}&current_page={current_page}"
-            logging.info(f"Fetching installers page {current_page}: {paginated_url}")
-            
-            page_response = requests.get(paginated_url, headers=installer_list_headers)
-            page_response.raise_for_status()
-            current_page_installers = page_response.json()
+def _call_with_authorization(site_url, api_key, api_secret, fetch):
+    """Call fetch(api_headers) with an authorized header dict and return its result.
 
-            if not isinstance(current_page_installers, list):
-                logging.error(f"Expected a list of installers but got {type(current_page_installers)}. Stopping.")
-                break
+    If the API rejects a cached access token with 401, the token is dropped
+    and fetch is retried once with a freshly issued one.
+    """
+    authorization = _get_authorization(site_url, api_key, api_secret)
+    try:
+        return fetch({"Authorization": authorization})
+    except requests.exceptions.HTTPError as e:
+        if e.response is None or e.response.status_code != 401:
+            raise
+        logging.info("Access token was rejected. Retrying once with a new token.")
+        _invalidate_authorization(site_url, api_key, authorization)
+        return fetch({"Authorization": _get_authorization(site_url, api_key, api_secret)})
 
-            if not current_page_installers: # No more installers on this page
-                logging.info("No more installers found on this page. End of data.")
-                break
-            
-            all_installers_data.extend(current_page_installers)
-            logging.info(f"Retrieved {len(current_page_installers)} installers from this page. Total retrieved so far: {len(all_installers_data)}.")
 
-            if len(current_page_installers) < per_page: # Last page reached
-                logging.info("Last page of installers reached.")
-                break
-            
-            current_page += 1 # Prepare for the next page
+# Define your HTTP trigger function using a decorator
+@app.route(route="GetBeyondTrustData", methods=["GET"], auth_level=func.AuthLevel.ANONYMOUS)
+def GetBeyondTrustData(req: func.HttpRequest) -> func.HttpResponse:
+    logging.info('Python HTTP trigger function processed a request.')
 
-        all_installers = all_installers_data
-        logging.info(f"Successfully retrieved a total of {len(all_installers)} Jump Client Installers after pagination.")
+    # Retrieve BeyondTrust credentials from environment variables
+    beyond_trust_site_url = os.environ.get('BeyondTrustSiteUrl')
+    api_key = os.environ.get('BeyondTrustApiKey')
+    api_secret = os.environ.get('BeyondTrustApiSecret')
+
+    # --- Basic Variable Check ---
+    if not beyond_trust_site_url or not api_key or not api_secret:
+        error_msg = "Error: BeyondTrust credentials environment variables are not set."
+        logging.error(error_msg)
+        return func.HttpResponse(
+            orjson.dumps({"error": error_msg}),
+            mimetype="application/json",
+            status_code=500
+        )
+
+    try:
+        # --- Fetch All Jump Groups and Jump Client Installers ---
+        jump_group_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-group"
+        base_installers_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-client/installer"
+        per_page = 100  # Equivalent to limit
+
+        def fetch_installer_data(api_headers):
+            logging.info(f"Attempting to retrieve ALL Jump Client Installers from: {base_installers_api_url} with pagination (per_page={per_page}).")
+
+            # The two fetches are independent: the Jump Group request runs on the shared
+            # pool while this thread drives the installer pages (also on the shared pool)
+            jump_groups_future = _io_executor.submit(_fetch_jump_group_map, jump_group_api_url, api_headers)
+            latest_installers = _fetch_latest_installers(base_installers_api_url, api_headers, per_page)
+            return jump_groups_future.result(), latest_installers
+
+        # --- Authentication Step (retried once with a new token if the cached one is rejected) ---
+        try:
+            jump_group_map, latest_installers = _call_with_authorization(beyond_trust_site_url, api_key, api_secret, fetch_installer_data)
+        except _AuthenticationError as e:
+            logging.error(f"Failed to obtain access token. Details: {e}")
+            return func.HttpResponse(
+                orjson.dumps({"error": "Failed to obtain access token.", "details": str(e)}),
+                mimetype="application/json",
+                status_code=401
+            )
+
+        logging.info(f"Successfully retrieved the latest Jump Client Installer for {len(latest_installers)} Jump Groups.")
 
         installer_details_output = []
-        if all_installers:
-            logging.info("Processing and grouping Jump Client Installers...")
-            installers_by_group = {}
-            for installer in all_installers:
-                group_id = installer.get('jump_group_id')
-                if group_id not in installers_by_group:
-                    installers_by_group[group_id] = []
-                installers_by_group[group_id].append(installer)
-
-            for group_id, installers_in_group in installers_by_group.items():
+        if latest_installers:
+            logging.info("Processing Jump Client Installers...")
+            download_url_prefix = f"{beyond_trust_site_url}/download_client_connector?jc="
+            for group_id, latest_installer_for_group in latest_installers.items():
                 jump_group_name = jump_group_map.get(group_id, f"Unknown Group (ID: {group_id})")
 
-                sorted_installers = sorted(
-                    installers_in_group,
-                    key=lambda x: x.get('expiration_timestamp', ''),
-                    reverse=True
-                )
-
-                # Select only the installer with the latest expiration date for this group
-                if sorted_installers: # Check if there are any installers for this group
-                    latest_installer_for_group = sorted_installers[0] # The first one is the latest due to reverse sort
-                    
-                    installer_id = latest_installer_for_group.get('installer_id')
-                    windows_download_url = f"{beyond_trust_site_url}/download_client_connector?jc={installer_id}&p=winNT-64-msi"
-                    mac_download_url = f"{beyond_trust_site_url}/download_client_connector?jc={installer_id}&p=mac-osx-x86"
-
-                    installer_details_output.append({
-                        "JumpGroupName": jump_group_name,
-                        "InstallerName": latest_installer_for_group.get('name'),
-                        "InstallerID": installer_id,
-                        "ExpirationDate": latest_installer_for_group.get('expiration_timestamp'),
-                        "WindowsDownloadURL": windows_download_url,
-                        "MacDownloadURL": mac_download_url
-                    })
+                installer_id = latest_installer_for_group.get('installer_id')
+                installer_download_url = download_url_prefix + str(installer_id)
+                windows_download_url = installer_download_url + "&p=winNT-64-msi"
+                mac_download_url = installer_download_url + "&p=mac-osx-x86"
+
+                installer_details_output.append({
+                    "JumpGroupName": jump_group_name,
+                    "InstallerName": latest_installer_for_group.get('name'),
+                    "InstallerID": installer_id,
+                    "ExpirationDate": latest_installer_for_group.get('expiration_timestamp'),
+                    "WindowsDownloadURL": windows_download_url,
+                    "MacDownloadURL": mac_download_url
+                })
             logging.info(f"Finished processing installers. Total items in output: {len(installer_details_output)}")
         else:
             logging.info("No Jump Client Installers found or the response was empty.")
 
         # Return the data as JSON
         return func.HttpResponse(
-            json.dumps(installer_details_output),
+            orjson.dumps(installer_details_output),
             mimetype="application/json",
             status_code=200
         )
@@ -168,14 +410,14 @@ def GetBeyondTrustData(req: func.HttpRequest) -> func.HttpResponse:
         error_details = e.response.text
         logging.error(f"HTTP Error: {status_code} - {error_details}")
         return func.HttpResponse(
-            json.dumps({"error": f"API request failed: {e}", "details": error_details}),
+            orjson.dumps({"error": f"API request failed: {e}", "details": error_details}),
             mimetype="application/json",
             status_code=status_code
         )
     except Exception as e:
         logging.error(f"An unexpected error occurred: {e}")
         return func.HttpResponse(
-            json.dumps({"error": f"An unexpected error occurred: {e}"}),
+            orjson.dumps({"error": f"An unexpected error occurred: {e}"}),
             mimetype="application/json",
             status_code=500
         )
@@ -200,73 +442,24 @@ def GetBeyondTrustJumpClientIPs(req: func.HttpRequest) -> func.HttpResponse:
         )
 
     try:
-        # --- Authentication Step ---
-        auth_url = f"{beyond_trust_site_url}/oauth2/token"
-        auth_string = f"{api_key}:{api_secret}"
-        base64_auth_string = base64.b64encode(auth_string.encode('utf-8')).decode('utf-8')
-
-        auth_headers = {
-            "Authorization": f"Basic {base64_auth_string}",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Accept": "application/json"
-        }
-        auth_body = {"grant_type": "client_credentials"}
-
-        logging.info(f"Attempting to obtain access token from: {auth_url}")
-        auth_response = requests.post(auth_url, headers=auth_headers, data=auth_body)
-        auth_response.raise_for_status()
-        auth_token_response = auth_response.json()
+        # --- Fetch all Jump Clients with pagination ---
+        jump_clients_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-client"
+        per_page = 100
 
-        access_token = auth_token_response.get('access_token')
-        token_type = auth_token_response.get('token_type')
+        def fetch_jump_clients(api_headers):
+            logging.info(f"Attempting to retrieve ALL Jump Clients from: {jump_clients_api_url} with pagination.")
+            return _fetch_all_pages(jump_clients_api_url, api_headers, "jump clients", per_page)
 
-        if not access_token:
-            error_details = auth_token_response.get('error_description', 'Unknown authentication error.')
-            logging.error(f"Failed to obtain access token. Details: {error_details}")
+        # --- Authentication Step (retried once with a new token if the cached one is rejected) ---
+        try:
+            all_jump_clients = _call_with_authorization(beyond_trust_site_url, api_key, api_secret, fetch_jump_clients)
+        except _AuthenticationError as e:
+            logging.error(f"Failed to obtain access token. Details: {e}")
             return func.HttpResponse(
-                f"Failed to obtain access token: {error_details}",
+                f"Failed to obtain access token: {e}",
                 mimetype="text/plain",
                 status_code=401
             )
-        logging.info("Successfully obtained access token.")
-
-        # --- Fetch all Jump Clients with pagination ---
-        jump_clients_api_url = f"{beyond_trust_site_url}/api/config/v1/jump-client"
-        api_headers = {
-            "Authorization": f"{token_type} {access_token}",
-            "Accept": "application/json"
-        }
-        
-        all_jump_clients = []
-        current_page = 1
-        per_page = 100
-
-        logging.info(f"Attempting to retrieve ALL Jump Clients from: {jump_clients_api_url} with pagination.")
-
-        while True:
-            paginated_url = f"{jump_clients_api_url}?per_page={per_page}&current_page={current_page}"
-            logging.info(f"Fetching jump clients page {current_page}: {paginated_url}")
-            
-            page_response = requests.get(paginated_url, headers=api_headers)
-            page_response.raise_for_status()
-            current_page_clients = page_response.json()
-
-            if not isinstance(current_page_clients, list):
-                logging.error(f"Expected a list of jump clients but got {type(current_page_clients)}. Stopping.")
-                break
-
-            if not current_page_clients:
-                logging.info("No more jump clients found on this page. End of data.")
-                break
-            
-            all_jump_clients.extend(current_page_clients)
-            logging.info(f"Retrieved {len(current_page_clients)} jump clients from this page. Total retrieved so far: {len(all_jump_clients)}.")
-
-            if len(current_page_clients) < per_page:
-                logging.info("Last page of jump clients reached.")
-                break
-            
-            current_page += 1
 
         logging.info(f"Successfully retrieved a total of {len(all_jump_clients)} Jump Clients.")
 